@@ -1,4 +1,5 @@
 # app/__init__.py
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
@@ -13,13 +14,28 @@ bcrypt = Bcrypt()
 login_manager.login_view = 'auth.login'  # Redirects for @login_required
 login_manager.login_message_category = 'info'
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     
     # Basic config
     app.config['SECRET_KEY'] = 'your-secret-key'  # Replace with a strong key
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['TEMPLATE_CACHE_DIR'] = os.environ.get('TEMPLATE_CACHE_DIR')  # defaults to instance/jinja_cache
+
+    # Listing photos
+    app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+    app.config['PHOTO_ROOT'] = os.environ.get('PHOTO_ROOT')  # defaults to instance/photos
+    app.config['THUMBNAIL_WORKERS'] = int(os.environ.get('THUMBNAIL_WORKERS', 1))
+    app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'  # when behind a server that supports it
+
+    # Overrides must be applied before the extensions read the config
+    if test_config:
+        app.config.update(test_config)
+
+    # Use precompiled templates if `flask precompile-templates` was run at build time
+    from app.startup import configure_template_cache, register_commands
+    configure_template_cache(app)
 
     # Initialize extensions with app
     db.init_app(app)
@@ -40,4 +56,9 @@ def create_app():
     app.register_blueprint(main)
     app.register_blueprint(auth, url_prefix='/auth')
 
+    register_commands(app)
+    from app.photos import generate_thumbnails_command, sweep_photos_command
+    app.cli.add_command(generate_thumbnails_command)
+    app.cli.add_command(sweep_photos_command)
+
     return app
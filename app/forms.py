@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, TextAreaField, FloatField, IntegerField, DateField, BooleanField, SelectField, SubmitField
+from flask_wtf.file import MultipleFileField, FileAllowed, FileRequired
+from wtforms import HiddenField, StringField, PasswordField, TextAreaField, FloatField, IntegerField, DateField, BooleanField, SelectField, SubmitField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange
 from app.models import User
 
@@ -36,6 +37,11 @@ class ListingForm(FlaskForm):
     amenities = TextAreaField('Amenities (comma-separated)')
     submit = SubmitField('Create Listing')
 
+# Photo Upload Form
+class PhotoForm(FlaskForm):
+    photos = MultipleFileField('Photos', validators=[FileRequired(), FileAllowed(['jpg', 'jpeg', 'png', 'webp'], 'Images only')])
+    submit = SubmitField('Upload Photos')
+
 # Booking Form
 class BookingForm(FlaskForm):
     start_date = DateField('Start Date', validators=[DataRequired()], format='%Y-%m-%d')
@@ -67,3 +73,12 @@ class SearchForm(FlaskForm):
     city = StringField('City')
     state = StringField('State', validators=[Length(max=2)])
     submit = SubmitField('Search')
+
+# Save Search Form, carries the current /listings query string
+class SaveSearchForm(FlaskForm):
+    search = HiddenField()
+    min_price = HiddenField()
+    max_price = HiddenField()
+    bedrooms = HiddenField()
+    city = HiddenField()
+    submit = SubmitField('Save Search')
@@ -10,6 +10,8 @@ class User(db.Model, UserMixin):
     listings = db.relationship('Listing', backref='owner', lazy=True)
     bookings = db.relationship('Booking', backref='tenant', lazy=True)
     reviews = db.relationship('Review', backref='reviewer', lazy=True)
+    saved_searches = db.relationship('SavedSearch', backref='user', lazy=True, cascade='all, delete-orphan')
+    search_matches = db.relationship('SearchMatch', backref='user', lazy=True)
 
 class Listing(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -32,6 +34,50 @@ class Listing(db.Model):
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     bookings = db.relationship('Booking', backref='listing', lazy=True)
     reviews = db.relationship('Review', backref='listing', lazy=True)
+    photos = db.relationship('ListingPhoto', backref='listing', lazy=True,
+                             order_by='ListingPhoto.position', cascade='all, delete-orphan')
+    search_matches = db.relationship('SearchMatch', backref='listing', lazy=True, cascade='all, delete-orphan')
+
+class ListingPhoto(db.Model):
+    # Files live on disk keyed by content_hash, see app/photos.py
+    id = db.Column(db.Integer, primary_key=True)
+    listing_id = db.Column(db.Integer, db.ForeignKey('listing.id'), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)
+    content_type = db.Column(db.String(50), nullable=False)
+    position = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('listing_id', 'content_hash'),)
+
+class SavedSearch(db.Model):
+    # Same predicates as the /listings query string, see app/searches.py
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    search = db.Column(db.String(200), nullable=True)
+    min_price = db.Column(db.Float, nullable=False, default=0)
+    max_price = db.Column(db.Float, nullable=True)
+    bedrooms = db.Column(db.Integer, nullable=True)
+    city = db.Column(db.String(100), nullable=True)
+    city_key = db.Column(db.String(100), nullable=False, default='')  # lowercased city, '' matches any
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    matches = db.relationship('SearchMatch', backref='saved_search', lazy=True, cascade='all, delete-orphan')
+    bands = db.relationship('SavedSearchBand', backref='saved_search', lazy=True, cascade='all, delete-orphan')
+
+class SavedSearchBand(db.Model):
+    # One row per price band a saved search covers, the primary key is the match index
+    city_key = db.Column(db.String(100), primary_key=True)
+    band = db.Column(db.Integer, primary_key=True)
+    saved_search_id = db.Column(db.Integer, db.ForeignKey('saved_search.id'), primary_key=True)
+
+class SearchMatch(db.Model):
+    # A user's inbox entry: listing_id started matching saved_search_id
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    saved_search_id = db.Column(db.Integer, db.ForeignKey('saved_search.id'), nullable=False)
+    listing_id = db.Column(db.Integer, db.ForeignKey('listing.id'), nullable=False)
+    is_read = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('saved_search_id', 'listing_id'),
+                      db.Index('ix_search_match_user_id_is_read', 'user_id', 'is_read'))
 
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
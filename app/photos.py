@@ -0,0 +1,245 @@
+# app/photos.py
+import hashlib
+import logging
+import os
+import string
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Bounding boxes (width, height), thumbnails keep the aspect ratio
+THUMBNAIL_SIZES = {
+    'small': (320, 240),
+    'medium': (800, 600),
+    'large': (1600, 1200),
+}
+
+# Formats we accept, keyed by what Pillow detects in the file itself
+CONTENT_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+# Content-addressed URLs never change, so caches may keep them for a year
+CACHE_MAX_AGE = 365 * 24 * 3600
+
+# Shown while a thumbnail is still being generated
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 4 3">'
+    '<rect width="4" height="3" fill="#dee2e6"/></svg>'
+)
+
+_executor = None
+_pending = set()
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def photo_root():
+    return current_app.config.get('PHOTO_ROOT') or os.path.join(current_app.instance_path, 'photos')
+
+
+def is_content_hash(value):
+    return len(value) == 64 and all(c in string.hexdigits for c in value)
+
+
+def _sharded(directory, content_hash, ext=''):
+    # Two-character fan-out keeps directories small
+    return os.path.join(directory, content_hash[:2], content_hash + ext)
+
+
+def original_path(content_hash):
+    return _sharded(os.path.join(photo_root(), 'originals'), content_hash)
+
+
+def thumbnail_path(content_hash, size):
+    return _sharded(os.path.join(photo_root(), 'thumbs', size), content_hash, '.jpg')
+
+
+def _verify_image(path):
+    """Return the content type of the image at path, raises InvalidImage"""
+    try:
+        with Image.open(path) as image:
+            image.verify()
+            image_format = image.format
+    except Exception as e:
+        raise InvalidImage('Not a valid image') from e
+    if image_format not in CONTENT_TYPES:
+        raise InvalidImage(f'Unsupported image format {image_format}')
+    return CONTENT_TYPES[image_format]
+
+
+def save_upload(file_storage):
+    """Stream an uploaded image to disk while hashing it.
+
+    Returns (content_hash, content_type), raises InvalidImage if Pillow
+    can't read the file. The file is stored once per content hash.
+    """
+    tmp_dir = os.path.join(photo_root(), 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    sha = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b''):
+                sha.update(chunk)
+                out.write(chunk)
+        content_type = _verify_image(tmp_path)
+        content_hash = sha.hexdigest()
+        dest = original_path(content_hash)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # Replace even if dest exists: the bytes are identical, and it restores a
+        # file removed by sweep-photos meanwhile and resets its age for the sweep
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return content_hash, content_type
+
+
+def _stored_files():
+    """Yield (content_hash, path) for every original and thumbnail on disk"""
+    directories = [os.path.join(photo_root(), 'originals')] + \
+        [os.path.join(photo_root(), 'thumbs', size) for size in THUMBNAIL_SIZES]
+    for directory in directories:
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                content_hash = filename.split('.', 1)[0]
+                if is_content_hash(content_hash):
+                    yield content_hash, os.path.join(dirpath, filename)
+
+
+def sweep_unreferenced(grace_seconds):
+    """Delete files no ListingPhoto references that are older than grace_seconds.
+
+    Runs outside requests: the grace period covers uploads whose file is
+    written but whose ListingPhoto isn't committed yet. Returns the number
+    of files removed.
+    """
+    from app import db
+    from app.models import ListingPhoto
+
+    referenced = {h for (h,) in db.session.query(ListingPhoto.content_hash).distinct()}
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for content_hash, path in _stored_files():
+        if content_hash in referenced:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def generate_thumbnails(source, targets):
+    """Write a JPEG thumbnail for each (max_size, dest) in targets.
+
+    Runs in a pool process, so it only takes plain paths and tuples.
+    """
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for max_size, dest in targets:
+            thumb = image.copy()
+            thumb.thumbnail(max_size)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest))
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    thumb.save(out, 'JPEG', quality=85, optimize=True)
+                os.replace(tmp_path, dest)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+
+def missing_thumbnails(content_hash):
+    return [(max_size, thumbnail_path(content_hash, size))
+            for size, max_size in THUMBNAIL_SIZES.items()
+            if not os.path.exists(thumbnail_path(content_hash, size))]
+
+
+def _get_executor():
+    # Created on first use so it is never inherited across a gunicorn fork.
+    # Every gunicorn worker has its own pool, so the deployment runs up to
+    # workers * THUMBNAIL_WORKERS resize processes.
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=current_app.config.get('THUMBNAIL_WORKERS', 1))
+    return _executor
+
+
+def _job_done(content_hash, future):
+    global _executor
+    _pending.discard(content_hash)
+    error = future.exception()
+    if error is not None:
+        logger.error('Thumbnail generation failed for %s', content_hash, exc_info=error)
+        if isinstance(error, BrokenProcessPool):
+            _executor = None  # a pool process died, start a fresh pool next time
+
+
+def schedule_thumbnails(content_hash):
+    """Generate any missing thumbnail sizes in the background.
+
+    Safe to call repeatedly: a hash already queued in this process is not
+    queued again, so serving code can call it to recover lost jobs.
+    """
+    if content_hash in _pending:
+        return None
+    targets = missing_thumbnails(content_hash)
+    if not targets:
+        return None
+    _pending.add(content_hash)
+    try:
+        future = _get_executor().submit(generate_thumbnails, original_path(content_hash), targets)
+    except BaseException:
+        _pending.discard(content_hash)
+        raise
+    future.add_done_callback(lambda f: _job_done(content_hash, f))
+    return future
+
+
+@click.command('generate-thumbnails')
+@with_appcontext
+def generate_thumbnails_command():
+    """Generate thumbnails missing after failed or dropped background jobs"""
+    from app import db
+    from app.models import ListingPhoto
+
+    generated = 0
+    for (content_hash,) in db.session.query(ListingPhoto.content_hash).distinct():
+        targets = missing_thumbnails(content_hash)
+        if not targets:
+            continue
+        try:
+            generate_thumbnails(original_path(content_hash), targets)
+            generated += 1
+        except Exception as e:
+            click.echo(f'{content_hash}: {e}', err=True)
+    click.echo(f'Generated thumbnails for {generated} photos')
+
+
+@click.command('sweep-photos')
+@click.option('--grace-hours', default=24.0, help='Keep unreferenced files younger than this.')
+@with_appcontext
+def sweep_photos_command(grace_hours):
+    """Remove photo files no listing uses any more"""
+    removed = sweep_unreferenced(grace_hours * 3600)
+    click.echo(f'Removed {removed} unreferenced files')
@@ -1,8 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+import os
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, send_file, Response
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload, contains_eager
 from app import db
-from app.models import Listing, Booking, Review
-from app.forms import ListingForm, BookingForm, ReviewForm, SearchForm
+from app.models import Listing, Booking, Review, ListingPhoto, SavedSearch, SearchMatch
+from app.forms import ListingForm, BookingForm, ReviewForm, SearchForm, PhotoForm, SaveSearchForm
+from app import photos, searches
 from datetime import datetime
 
 main = Blueprint('main', __name__)
@@ -26,8 +29,61 @@ def listings():
         query = query.filter(Listing.price_per_month <= float(request.args.get('max_price')))
     if request.args.get('bedrooms'):
         query = query.filter(Listing.bedrooms >= int(request.args.get('bedrooms')))
-    all_listings = query.order_by(Listing.created_at.desc()).all()
-    return render_template('listings.html', listings=all_listings, search_form=search_form)
+    if request.args.get('city'):
+        query = query.filter(db.func.lower(Listing.city) == searches.city_key(request.args.get('city')))
+    all_listings = query.options(selectinload(Listing.photos)).order_by(Listing.created_at.desc()).all()
+    save_search_form = None
+    # Only the known filters, other query args must not reach the form constructor
+    filters = {k: request.args.get(k) for k in ('search', 'min_price', 'max_price', 'bedrooms', 'city')}
+    if current_user.is_authenticated and any(filters.values()):
+        save_search_form = SaveSearchForm(formdata=None, data=filters)
+    return render_template('listings.html', listings=all_listings, search_form=search_form,
+                           save_search_form=save_search_form)
+
+@main.route('/searches', methods=['POST'])
+@login_required
+def save_search():
+    form = SaveSearchForm()
+    if form.validate_on_submit():
+        try:
+            saved_search = searches.saved_search_from_args(form.data, current_user.id)
+        except ValueError:
+            flash('Invalid search filters.', 'danger')
+            return redirect(url_for('main.listings'))
+        try:
+            db.session.add(saved_search)
+            db.session.commit()
+            flash('Search saved! New matching listings will show up on your dashboard.', 'success')
+        except:
+            db.session.rollback()
+            flash('An error occurred. Please try again.', 'danger')
+    return redirect(url_for('main.dashboard'))
+
+@main.route('/searches/<int:search_id>/delete', methods=['POST'])
+@login_required
+def delete_search(search_id):
+    saved_search = SavedSearch.query.get_or_404(search_id)
+    if saved_search.user_id != current_user.id:
+        abort(403)
+    try:
+        db.session.delete(saved_search)
+        db.session.commit()
+        flash('Saved search deleted.', 'success')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Please try again.', 'danger')
+    return redirect(url_for('main.dashboard'))
+
+@main.route('/searches/inbox/read', methods=['POST'])
+@login_required
+def mark_matches_read():
+    try:
+        SearchMatch.query.filter_by(user_id=current_user.id, is_read=False).update({'is_read': True})
+        db.session.commit()
+    except:
+        db.session.rollback()
+        flash('An error occurred. Please try again.', 'danger')
+    return redirect(url_for('main.dashboard'))
 
 @main.route('/listing/<int:listing_id>')
 def listing_detail(listing_id):
@@ -63,6 +119,7 @@ def create_listing():
         try:
             db.session.add(listing)
             db.session.commit()
+            searches.record_matches(listing)
             flash('Listing created successfully!', 'success')
             return redirect(url_for('main.listing_detail', listing_id=listing.id))
         except:
@@ -94,12 +151,91 @@ def edit_listing(listing_id):
         listing.updated_at = datetime.utcnow()
         try:
             db.session.commit()
+            searches.record_matches(listing)
             flash('Listing updated successfully!', 'success')
             return redirect(url_for('main.listing_detail', listing_id=listing.id))
         except:
             db.session.rollback()
             flash('An error occurred. Please try again.', 'danger')
-    return render_template('edit_listing.html', form=form, listing=listing)
+    return render_template('edit_listing.html', form=form, listing=listing, photo_form=PhotoForm())
+
+@main.route('/listing/<int:listing_id>/photos', methods=['POST'])
+@login_required
+def upload_photos(listing_id):
+    listing = Listing.query.get_or_404(listing_id)
+    if listing.owner_id != current_user.id:
+        abort(403)
+    form = PhotoForm()
+    if form.validate_on_submit():
+        existing = {p.content_hash for p in listing.photos}
+        position = max((p.position or 0 for p in listing.photos), default=-1) + 1
+        added = []
+        try:
+            for upload in form.photos.data:
+                try:
+                    content_hash, content_type = photos.save_upload(upload)
+                except photos.InvalidImage:
+                    flash(f'{upload.filename} is not a valid JPEG, PNG or WebP image.', 'danger')
+                    continue
+                if content_hash in existing:
+                    continue
+                existing.add(content_hash)
+                db.session.add(ListingPhoto(
+                    listing_id=listing.id,
+                    content_hash=content_hash,
+                    content_type=content_type,
+                    position=position
+                ))
+                position += 1
+                added.append(content_hash)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            flash('An error occurred. Please try again.', 'danger')
+            return redirect(url_for('main.edit_listing', listing_id=listing.id))
+        # Resizing happens in the process pool, not on this request
+        for content_hash in added:
+            photos.schedule_thumbnails(content_hash)
+        flash(f'{len(added)} photo(s) uploaded successfully!', 'success')
+    else:
+        for error in form.photos.errors:
+            flash(error, 'danger')
+    return redirect(url_for('main.edit_listing', listing_id=listing.id))
+
+@main.route('/photos/<string:content_hash>/<string:size>')
+def photo(content_hash, size):
+    if not photos.is_content_hash(content_hash) or size not in photos.THUMBNAIL_SIZES:
+        abort(404)
+    path = photos.thumbnail_path(content_hash, size)
+    if os.path.exists(path):
+        response = send_file(path, mimetype='image/jpeg', conditional=True, max_age=photos.CACHE_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
+    if ListingPhoto.query.filter_by(content_hash=content_hash).first() is None \
+            or not os.path.exists(photos.original_path(content_hash)):
+        abort(404)
+    # Still being generated, or the job was lost (failed, or its worker exited): queue it again
+    photos.schedule_thumbnails(content_hash)
+    response = Response(photos.PLACEHOLDER_SVG, mimetype='image/svg+xml')
+    response.cache_control.no_store = True
+    return response
+
+@main.route('/photo/<int:photo_id>/delete', methods=['POST'])
+@login_required
+def delete_photo(photo_id):
+    listing_photo = ListingPhoto.query.get_or_404(photo_id)
+    if listing_photo.listing.owner_id != current_user.id:
+        abort(403)
+    listing_id = listing_photo.listing_id
+    content_hash = listing_photo.content_hash
+    try:
+        db.session.delete(listing_photo)
+        db.session.commit()
+        flash('Photo deleted successfully!', 'success')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Please try again.', 'danger')
+    return redirect(url_for('main.edit_listing', listing_id=listing_id))
 
 @main.route('/listing/<int:listing_id>/delete', methods=['POST'])
 @login_required
@@ -191,7 +327,13 @@ def dashboard():
     listing_ids = [l.id for l in my_listings]
     received_bookings = Booking.query.filter(Booking.listing_id.in_(listing_ids)).all() if listing_ids else []
     my_bookings = Booking.query.filter_by(tenant_id=current_user.id).all()
-    return render_template('dashboard.html', my_listings=my_listings, received_bookings=received_bookings, my_bookings=my_bookings)
+    saved_searches = SavedSearch.query.filter_by(user_id=current_user.id).order_by(SavedSearch.created_at.desc()).all()
+    new_matches = SearchMatch.query.join(SearchMatch.listing) \
+        .filter(SearchMatch.user_id == current_user.id, SearchMatch.is_read == False, Listing.is_active == True) \
+        .options(contains_eager(SearchMatch.listing)) \
+        .order_by(SearchMatch.created_at.desc()).all()
+    return render_template('dashboard.html', my_listings=my_listings, received_bookings=received_bookings, my_bookings=my_bookings,
+                           saved_searches=saved_searches, new_matches=new_matches)
 
 @main.route('/about')
 def about():
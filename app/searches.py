@@ -0,0 +1,83 @@
+# app/searches.py
+from flask import current_app
+from app import db
+from app.models import SavedSearch, SavedSearchBand, SearchMatch
+
+# Prices are indexed in $250 bands, everything from $10,000 up shares the last one
+PRICE_BAND = 250
+MAX_BAND = 40
+
+
+def city_key(city):
+    return (city or '').strip().lower()
+
+
+def price_band(price):
+    return min(max(int(price // PRICE_BAND), 0), MAX_BAND)
+
+
+def saved_search_from_args(args, user_id):
+    """Build a SavedSearch from /listings query args, raises ValueError on bad numbers"""
+    min_price = args.get('min_price')
+    max_price = args.get('max_price')
+    bedrooms = args.get('bedrooms')
+    city = (args.get('city') or '').strip()
+    saved_search = SavedSearch(
+        user_id=user_id,
+        search=args.get('search') or None,
+        min_price=float(min_price) if min_price else 0,
+        max_price=float(max_price) if max_price else None,
+        bedrooms=int(bedrooms) if bedrooms else None,
+        city=city or None,
+        city_key=city_key(city),
+    )
+    last_band = MAX_BAND if saved_search.max_price is None else price_band(saved_search.max_price)
+    saved_search.bands = [SavedSearchBand(city_key=saved_search.city_key, band=band)
+                          for band in range(price_band(saved_search.min_price), last_band + 1)]
+    return saved_search
+
+
+def matching_searches(listing):
+    """Saved searches whose predicates the listing satisfies.
+
+    Candidates come from an equality lookup on the SavedSearchBand primary
+    key: searches for this city (or any city) whose price range covers the
+    listing's $250 band. Only those are checked against the exact price,
+    bedrooms and search term, so searches that can't match on city or
+    price are never read.
+    """
+    candidates = SavedSearch.query.join(SavedSearch.bands).filter(
+        SavedSearchBand.city_key.in_([city_key(listing.city), '']),
+        SavedSearchBand.band == price_band(listing.price_per_month),
+        SavedSearch.min_price <= listing.price_per_month,
+        (SavedSearch.max_price.is_(None)) | (SavedSearch.max_price >= listing.price_per_month),
+        (SavedSearch.bedrooms.is_(None)) | (SavedSearch.bedrooms <= listing.bedrooms),
+    ).all()
+    text = f'{listing.title}\n{listing.description}'.lower()
+    return [s for s in candidates if not s.search or s.search.lower() in text]
+
+
+def record_matches(listing):
+    """Add inbox entries for searches the listing newly matches, returns how many.
+
+    Never raises: it runs after the listing is committed, and a failed
+    notification shouldn't look like a failed save.
+    """
+    if not listing.is_active:
+        return 0
+    try:
+        searches = [s for s in matching_searches(listing) if s.user_id != listing.owner_id]
+        if not searches:
+            return 0
+        already = {saved_search_id for (saved_search_id,) in db.session.query(SearchMatch.saved_search_id).filter(
+            SearchMatch.listing_id == listing.id,
+            SearchMatch.saved_search_id.in_([s.id for s in searches]))}
+        new = [SearchMatch(user_id=s.user_id, saved_search_id=s.id, listing_id=listing.id)
+               for s in searches if s.id not in already]
+        db.session.add_all(new)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        current_app.logger.exception('Recording saved search matches failed')
+        return 0
+    return len(new)
@@ -0,0 +1,132 @@
+# app/startup.py
+import gc
+import os
+import subprocess
+import sys
+
+import click
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app import db
+
+
+def template_cache_dir(app):
+    """Directory holding precompiled Jinja bytecode for this app"""
+    return app.config.get('TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+
+
+def configure_template_cache(app):
+    """Load templates from the bytecode cache if one has been built"""
+    cache_dir = template_cache_dir(app)
+    if os.path.isdir(cache_dir):
+        app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(cache_dir)}
+
+
+def precompile_templates(app):
+    """Compile every template into the bytecode cache.
+
+    Returns (compiled, failed) where failed maps template names to the
+    TemplateSyntaxError that stopped them from compiling.
+    """
+    cache_dir = template_cache_dir(app)
+    os.makedirs(cache_dir, exist_ok=True)
+    env = app.jinja_env.overlay(bytecode_cache=FileSystemBytecodeCache(cache_dir))
+    compiled, failed = [], {}
+    for name in env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        try:
+            env.get_template(name)
+            compiled.append(name)
+        except TemplateSyntaxError as e:
+            failed[name] = e
+    return compiled, failed
+
+
+def warm_templates(app):
+    """Load every template into the in-memory Jinja cache"""
+    env = app.jinja_env
+    for name in env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        try:
+            env.get_template(name)
+        except TemplateSyntaxError:
+            pass  # reported by precompile-templates, fails again on render
+
+
+def warm_db_pool(app):
+    """Open up to pool_size connections so the first requests don't pay for them"""
+    with app.app_context():
+        pool = db.engine.pool
+        size = pool.size() if isinstance(pool, QueuePool) else 1
+        connections = []
+        try:
+            for _ in range(size):
+                conn = db.engine.connect()
+                connections.append(conn)
+                conn.execute(text('SELECT 1'))
+        finally:
+            # Closing returns the connections to the pool, they stay open
+            for conn in connections:
+                conn.close()
+
+
+def prepare_for_fork(app):
+    """Run in the master before forking workers (gunicorn preload_app)"""
+    warm_templates(app)
+    with app.app_context():
+        # Connections must never be shared between processes
+        db.engine.dispose()
+    # Keep the objects loaded so far out of GC passes, so the collector
+    # doesn't touch (and un-share) their memory pages in workers. gc stays
+    # disabled in the master until then, see gunicorn.conf.py
+    gc.freeze()
+
+
+def init_worker(app):
+    """Run in each worker right after it is forked"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+    warm_db_pool(app)
+
+
+def profile_imports(cwd, module='app', python=sys.executable):
+    """Run create_app() under -X importtime, returns (cumulative_us, module) pairs"""
+    code = f'from {module} import create_app; create_app()'
+    result = subprocess.run([python, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=cwd)
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr)
+    return parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # header line
+        timings.append((int(fields[1]), fields[2].strip()))
+    return sorted(timings, reverse=True)
+
+
+def register_commands(app):
+    @app.cli.command('profile-startup')
+    @click.option('--limit', default=20, help='Number of imports to show.')
+    def profile_startup(limit):
+        """Show the slowest imports made by create_app()"""
+        # Run from the project root so `app` imports wherever flask was started
+        timings = profile_imports(cwd=os.path.dirname(app.root_path))
+        for cumulative, module in timings[:limit]:
+            click.echo(f'{cumulative / 1000:10.1f} ms  {module}')
+
+    @app.cli.command('precompile-templates')
+    def precompile_templates_command():
+        """Build the Jinja bytecode cache"""
+        compiled, failed = precompile_templates(app)
+        click.echo(f'Compiled {len(compiled)} templates into {template_cache_dir(app)}')
+        for name, error in failed.items():
+            click.echo(f'{name}:{error.lineno}: {error.message}', err=True)
+        if failed:
+            raise SystemExit(1)
@@ -0,0 +1,27 @@
+# gunicorn.conf.py
+# Load the app once in the master so workers share its memory pages copy-on-write.
+# Build step: `flask --app run precompile-templates`
+import gc
+import multiprocessing
+
+# No collections while the app preloads, they would touch (and un-share) its pages.
+# prepare_for_fork() freezes what was loaded, post_fork() re-enables gc in each worker.
+gc.disable()
+
+wsgi_app = 'run:app'
+bind = '0.0.0.0:8000'
+workers = multiprocessing.cpu_count() * 2 + 1
+preload_app = True
+
+
+def when_ready(server):
+    from run import app
+    from app.startup import prepare_for_fork
+    prepare_for_fork(app)
+
+
+def post_fork(server, worker):
+    from run import app
+    from app.startup import init_worker
+    init_worker(app)
+    gc.enable()
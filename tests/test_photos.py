@@ -0,0 +1,214 @@
+# tests/test_photos.py
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from app import create_app, db, bcrypt, photos
+from app.models import User, Listing, ListingPhoto
+
+def image_bytes(size=(2000, 1500), fmt='JPEG', color='red'):
+    out = io.BytesIO()
+    Image.new('RGB', size, color).save(out, fmt)
+    return out.getvalue()
+
+class PhotoTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test app with a temporary photo store"""
+        self.photo_root = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'WTF_CSRF_ENABLED': False,
+            'PHOTO_ROOT': self.photo_root.name,
+        })
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.owner = self.create_user('owner')
+        self.listing = self.create_listing()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.photo_root.cleanup()
+
+    def create_user(self, username):
+        user = User(username=username, email=f'{username}@sjsu.edu',
+                    password=bcrypt.generate_password_hash('password').decode('utf-8'))
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def create_listing(self):
+        listing = Listing(title='Test Listing', description='Description', address='123 Test St',
+                          city='San Jose', state='CA', zip_code='95112', price_per_month=1000.00,
+                          bedrooms=1, bathrooms=1.0, available_from=date.today(), owner_id=self.owner.id)
+        db.session.add(listing)
+        db.session.commit()
+        return listing
+
+    def login(self, username):
+        return self.client.post('/auth/login', data={'username': username, 'password': 'password'})
+
+    def upload(self, data, filename='room.jpg'):
+        return photos.save_upload(FileStorage(stream=io.BytesIO(data), filename=filename))
+
+    def add_photo(self, listing, data):
+        content_hash, content_type = self.upload(data)
+        listing_photo = ListingPhoto(listing_id=listing.id, content_hash=content_hash, content_type=content_type)
+        db.session.add(listing_photo)
+        db.session.commit()
+        return listing_photo
+
+    def post_photos(self, files):
+        return self.client.post(f'/listing/{self.listing.id}/photos', data={
+            'photos': [(io.BytesIO(data), filename) for data, filename in files]
+        }, content_type='multipart/form-data')
+
+    def test_save_upload_is_content_addressed(self):
+        data = image_bytes()
+        content_hash, content_type = self.upload(data)
+        self.assertEqual(content_hash, hashlib.sha256(data).hexdigest())
+        self.assertEqual(content_type, 'image/jpeg')
+        with open(photos.original_path(content_hash), 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_save_upload_deduplicates(self):
+        data = image_bytes(fmt='PNG')
+        first = self.upload(data, 'a.jpg')
+        second = self.upload(data, 'b.png')
+        self.assertEqual(first, second)
+        self.assertEqual(first[1], 'image/png')  # detected from the bytes, not the name
+        self.assertEqual(os.listdir(os.path.join(self.photo_root.name, 'tmp')), [])
+
+    def test_save_upload_rejects_non_images(self):
+        with self.assertRaises(photos.InvalidImage):
+            self.upload(b'<script>alert(1)</script>', 'room.jpg')
+        self.assertEqual(os.listdir(os.path.join(self.photo_root.name, 'tmp')), [])
+        self.assertFalse(os.path.exists(os.path.join(self.photo_root.name, 'originals')))
+
+    def test_generate_thumbnails_sizes(self):
+        content_hash, _ = self.upload(image_bytes((2000, 1500)))
+        photos.generate_thumbnails(photos.original_path(content_hash), photos.missing_thumbnails(content_hash))
+        expected = {'small': (320, 240), 'medium': (800, 600), 'large': (1600, 1200)}
+        for size, dimensions in expected.items():
+            with Image.open(photos.thumbnail_path(content_hash, size)) as thumb:
+                self.assertEqual(thumb.format, 'JPEG')
+                self.assertEqual(thumb.size, dimensions)
+
+    def test_schedule_thumbnails(self):
+        content_hash, _ = self.upload(image_bytes((1000, 500)))
+        future = photos.schedule_thumbnails(content_hash)
+        future.result(timeout=60)
+        self.assertEqual(photos.missing_thumbnails(content_hash), [])
+        with Image.open(photos.thumbnail_path(content_hash, 'small')) as thumb:
+            self.assertEqual(thumb.size, (320, 160))
+        self.assertIsNone(photos.schedule_thumbnails(content_hash))
+
+    def test_upload_photos(self):
+        self.login('owner')
+        red, blue = image_bytes(color='red'), image_bytes(fmt='PNG', color='blue')
+        with mock.patch.object(photos, 'schedule_thumbnails') as schedule:
+            response = self.post_photos([(red, 'a.jpg'), (red, 'b.jpg'), (blue, 'c.png')])
+            self.assertEqual(response.status_code, 302)
+            self.post_photos([(red, 'again.jpg')])
+
+        listing_photos = ListingPhoto.query.order_by(ListingPhoto.position).all()
+        self.assertEqual([p.content_type for p in listing_photos], ['image/jpeg', 'image/png'])
+        self.assertEqual([p.position for p in listing_photos], [0, 1])
+        self.assertEqual(schedule.call_count, 2)
+
+    def test_upload_photos_rejects_invalid_image(self):
+        self.login('owner')
+        with mock.patch.object(photos, 'schedule_thumbnails') as schedule:
+            self.post_photos([(b'not an image', 'fake.jpg')])
+        self.assertEqual(ListingPhoto.query.count(), 0)
+        schedule.assert_not_called()
+
+    def test_upload_photos_requires_owner(self):
+        self.create_user('other')
+        self.login('other')
+        response = self.post_photos([(image_bytes(), 'a.jpg')])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(ListingPhoto.query.count(), 0)
+
+    def test_photo_rejects_bad_hash_and_size(self):
+        content_hash = self.add_photo(self.listing, image_bytes()).content_hash
+        self.assertEqual(self.client.get('/photos/not-a-hash/small').status_code, 404)
+        self.assertEqual(self.client.get(f'/photos/{content_hash}/huge').status_code, 404)
+        self.assertEqual(self.client.get(f'/photos/{"0" * 64}/small').status_code, 404)
+
+    def test_photo_serves_thumbnail_with_long_cache(self):
+        content_hash = self.add_photo(self.listing, image_bytes()).content_hash
+        photos.generate_thumbnails(photos.original_path(content_hash), photos.missing_thumbnails(content_hash))
+        with open(photos.thumbnail_path(content_hash, 'small'), 'rb') as f:
+            thumbnail = f.read()
+
+        response = self.client.get(f'/photos/{content_hash}/small')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, thumbnail)
+        self.assertEqual(response.cache_control.max_age, photos.CACHE_MAX_AGE)
+        self.assertTrue(response.cache_control.immutable)
+        response.close()
+
+        response = self.client.get(f'/photos/{content_hash}/small', headers={'Range': 'bytes=0-9'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, thumbnail[:10])
+        response.close()
+
+    def test_photo_placeholder_reschedules_missing_thumbnail(self):
+        content_hash = self.add_photo(self.listing, image_bytes()).content_hash
+        with mock.patch.object(photos, 'schedule_thumbnails') as schedule:
+            response = self.client.get(f'/photos/{content_hash}/small')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/svg+xml')
+        self.assertTrue(response.cache_control.no_store)
+        schedule.assert_called_once_with(content_hash)
+
+    def sweep(self, grace_hours):
+        return self.app.test_cli_runner().invoke(args=['sweep-photos', '--grace-hours', str(grace_hours)])
+
+    def test_sweep_removes_files_once_unreferenced(self):
+        data = image_bytes()
+        shared = self.add_photo(self.listing, data)
+        other_listing = self.create_listing()
+        other = self.add_photo(other_listing, data)
+        content_hash = shared.content_hash
+        photos.generate_thumbnails(photos.original_path(content_hash), photos.missing_thumbnails(content_hash))
+        self.login('owner')
+
+        self.client.post(f'/listing/{self.listing.id}/delete')
+        self.assertIsNone(Listing.query.filter_by(id=self.listing.id).first())
+        self.sweep(0)
+        self.assertTrue(os.path.exists(photos.original_path(content_hash)))
+
+        self.client.post(f'/photo/{other.id}/delete')
+        self.assertEqual(ListingPhoto.query.count(), 0)
+        # Deleting never removes files inline, and recent files survive the grace period
+        self.assertTrue(os.path.exists(photos.original_path(content_hash)))
+        self.sweep(24)
+        self.assertTrue(os.path.exists(photos.original_path(content_hash)))
+
+        result = self.sweep(0)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Removed 4 unreferenced files', result.output)
+        self.assertFalse(os.path.exists(photos.original_path(content_hash)))
+        self.assertFalse(os.path.exists(photos.thumbnail_path(content_hash, 'small')))
+
+    def test_save_upload_restores_swept_original(self):
+        data = image_bytes()
+        content_hash, _ = self.upload(data)
+        os.remove(photos.original_path(content_hash))
+        self.upload(data)
+        self.assertTrue(os.path.exists(photos.original_path(content_hash)))
+
+if __name__ == '__main__':
+    unittest.main()
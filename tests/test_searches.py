@@ -0,0 +1,200 @@
+# tests/test_searches.py
+import unittest
+from datetime import date
+from unittest import mock
+from app import create_app, db, bcrypt
+from app.models import User, Listing, SavedSearch, SavedSearchBand, SearchMatch
+from app.searches import saved_search_from_args, matching_searches, record_matches, MAX_BAND
+
+class SavedSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test app and database"""
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'WTF_CSRF_ENABLED': False,
+        })
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        password = bcrypt.generate_password_hash('password').decode('utf-8')
+        self.owner = User(username='owner', email='owner@sjsu.edu', password=password)
+        self.student = User(username='student', email='student@sjsu.edu', password=password)
+        db.session.add_all([self.owner, self.student])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self, username):
+        self.client.get('/auth/logout')
+        return self.client.post('/auth/login', data={'username': username, 'password': 'password'})
+
+    def save(self, user, **args):
+        saved_search = saved_search_from_args(args, user.id)
+        db.session.add(saved_search)
+        db.session.commit()
+        return saved_search
+
+    def create_listing(self, **fields):
+        values = dict(title='Cozy Apartment', description='Great place near campus', address='123 Main St',
+                      city='San Jose', state='CA', zip_code='95112', price_per_month=1200.00,
+                      bedrooms=2, bathrooms=1.0, available_from=date.today(), owner_id=self.owner.id)
+        values.update(fields)
+        listing = Listing(**values)
+        db.session.add(listing)
+        db.session.commit()
+        return listing
+
+    def test_saved_search_from_args(self):
+        saved_search = saved_search_from_args({'min_price': '500', 'bedrooms': '2', 'city': ' San Jose '}, 1)
+        self.assertEqual(saved_search.min_price, 500.0)
+        self.assertIsNone(saved_search.max_price)
+        self.assertEqual(saved_search.bedrooms, 2)
+        self.assertEqual(saved_search.city_key, 'san jose')
+        with self.assertRaises(ValueError):
+            saved_search_from_args({'min_price': 'cheap'}, 1)
+
+    def test_saved_search_bands(self):
+        bounded = saved_search_from_args({'min_price': '500', 'max_price': '1000', 'city': 'San Jose'}, 1)
+        self.assertEqual([b.band for b in bounded.bands], [2, 3, 4])
+        self.assertEqual({b.city_key for b in bounded.bands}, {'san jose'})
+        unbounded = saved_search_from_args({}, 1)
+        self.assertEqual([b.band for b in unbounded.bands], list(range(MAX_BAND + 1)))
+
+    def test_matching_searches_in_top_band(self):
+        expensive = self.save(self.student, min_price='12000')
+        self.assertEqual(matching_searches(self.create_listing(price_per_month=10500.00)), [])
+        self.assertEqual([s.id for s in matching_searches(self.create_listing(price_per_month=15000.00))],
+                         [expensive.id])
+
+    def test_matching_searches(self):
+        matching = [
+            self.save(self.student),
+            self.save(self.student, min_price='1000', max_price='1500', bedrooms='2', city='san jose'),
+            self.save(self.student, search='campus'),
+        ]
+        self.save(self.student, city='Santa Clara')
+        self.save(self.student, min_price='1300')
+        self.save(self.student, max_price='1000')
+        self.save(self.student, bedrooms='3')
+        self.save(self.student, search='downtown')
+
+        listing = self.create_listing()
+        self.assertEqual({s.id for s in matching_searches(listing)}, {s.id for s in matching})
+
+    def test_record_matches_only_adds_new_matches(self):
+        cheap = self.save(self.student, max_price='1000')
+        self.save(self.owner)
+        listing = self.create_listing(price_per_month=1200.00)
+        self.assertEqual(record_matches(listing), 0)
+
+        listing.price_per_month = 900.00
+        db.session.commit()
+        self.assertEqual(record_matches(listing), 1)
+        self.assertEqual(record_matches(listing), 0)
+
+        match = SearchMatch.query.one()
+        self.assertEqual(match.user_id, self.student.id)
+        self.assertEqual(match.saved_search_id, cheap.id)
+        self.assertFalse(match.is_read)
+
+    def test_deleting_listing_removes_matches(self):
+        self.save(self.student)
+        listing = self.create_listing()
+        record_matches(listing)
+        db.session.delete(listing)
+        db.session.commit()
+        self.assertEqual(SearchMatch.query.count(), 0)
+        self.assertEqual(SavedSearch.query.count(), 1)
+
+    def test_listings_ignores_unknown_query_args(self):
+        self.login('student')
+        response = self.client.get('/listings?data=x')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'Save Search', response.data)
+        response = self.client.get('/listings?prefix=x&min_price=500')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'name="min_price" type="hidden" value="500"', response.data)
+
+    def test_record_matches_never_raises(self):
+        self.save(self.student)
+        listing = self.create_listing()
+        with mock.patch('app.searches.matching_searches', side_effect=RuntimeError('db down')):
+            self.assertEqual(record_matches(listing), 0)
+
+    def test_save_search_route(self):
+        self.login('student')
+        response = self.client.post('/searches', data={'min_price': '500', 'max_price': '1000', 'city': 'San Jose'})
+        self.assertEqual(response.status_code, 302)
+        saved_search = SavedSearch.query.one()
+        self.assertEqual(saved_search.user_id, self.student.id)
+        self.assertEqual((saved_search.min_price, saved_search.max_price, saved_search.city), (500.0, 1000.0, 'San Jose'))
+        self.assertEqual(SavedSearchBand.query.count(), 3)
+
+        self.client.post('/searches', data={'min_price': 'cheap'})
+        self.assertEqual(SavedSearch.query.count(), 1)
+
+    def test_delete_search_route(self):
+        saved_search = self.save(self.student, city='San Jose')
+        self.login('owner')
+        response = self.client.post(f'/searches/{saved_search.id}/delete')
+        self.assertEqual(response.status_code, 403)
+
+        self.login('student')
+        self.client.post(f'/searches/{saved_search.id}/delete')
+        self.assertEqual(SavedSearch.query.count(), 0)
+        self.assertEqual(SavedSearchBand.query.count(), 0)
+
+    def test_mark_matches_read(self):
+        self.save(self.student)
+        record_matches(self.create_listing())
+        self.login('student')
+        self.client.post('/searches/inbox/read')
+        self.assertTrue(SearchMatch.query.one().is_read)
+
+    def test_listing_routes_record_matches(self):
+        self.save(self.student, max_price='1000')
+        self.login('owner')
+        form = {
+            'title': 'Test Listing',
+            'description': 'Description for test listing',
+            'address': '123 Main St',
+            'city': 'San Jose',
+            'state': 'CA',
+            'zip_code': '95112',
+            'price_per_month': 1200,
+            'bedrooms': 2,
+            'bathrooms': 1,
+            'square_feet': 800,
+            'available_from': '2025-01-01',
+            'available_to': '2025-12-31',
+            'amenities': 'WiFi'
+        }
+        self.client.post('/listing/create', data=form)
+        listing = Listing.query.one()
+        self.assertEqual(SearchMatch.query.count(), 0)
+
+        self.client.post(f'/listing/{listing.id}/edit', data=dict(form, price_per_month=900))
+        self.assertEqual(SearchMatch.query.one().listing_id, listing.id)
+
+        self.login('student')
+        self.assertIn(b'Test Listing', self.client.get('/dashboard').data)
+
+    def test_dashboard_hides_inactive_listings(self):
+        self.save(self.student)
+        listing = self.create_listing(title='Gone Apartment')
+        record_matches(listing)
+        listing.is_active = False
+        db.session.commit()
+        self.login('student')
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'Gone Apartment', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
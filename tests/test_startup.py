@@ -0,0 +1,67 @@
+# tests/test_startup.py
+import os
+import tempfile
+import unittest
+import click
+from app import create_app, db
+from app.startup import parse_importtime, precompile_templates, profile_imports, warm_db_pool, init_worker
+
+class StartupTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test app with a temporary template cache and file database"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'jinja_cache')
+        # A file database so the engine gets a real QueuePool
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(self.tmp_dir.name, 'test.db'),
+            'TEMPLATE_CACHE_DIR': self.cache_dir,
+        })
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def test_precompile_templates(self):
+        compiled, failed = precompile_templates(self.app)
+        self.assertIn('base.html', compiled)
+        self.assertEqual(failed, {})
+        self.assertEqual(len(os.listdir(self.cache_dir)), len(compiled))
+
+    def test_precompile_templates_command(self):
+        result = self.app.test_cli_runner().invoke(args=['precompile-templates'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Compiled', result.output)
+        self.assertTrue(os.listdir(self.cache_dir))
+
+    def test_warm_db_pool(self):
+        warm_db_pool(self.app)
+        with self.app.app_context():
+            pool = db.engine.pool
+            self.assertEqual(pool.checkedin(), pool.size())
+
+    def test_init_worker_replaces_pool(self):
+        warm_db_pool(self.app)
+        with self.app.app_context():
+            inherited = db.engine.pool
+        init_worker(self.app)
+        with self.app.app_context():
+            pool = db.engine.pool
+            self.assertIsNot(pool, inherited)
+            self.assertEqual(pool.checkedin(), pool.size())
+
+    def test_profile_imports_reports_failure(self):
+        with self.assertRaises(click.ClickException):
+            profile_imports(cwd=self.tmp_dir.name, module='no_such_module')
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   jinja2.utils\n'
+            'import time:       300 |       4500 | flask\n'
+        )
+        self.assertEqual(parse_importtime(output), [(4500, 'flask'), (120, 'jinja2.utils')])
+
+if __name__ == '__main__':
+    unittest.main()